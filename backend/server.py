@@ -1,24 +1,39 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+import asyncio
+
+# uvloop is a faster drop-in event loop; it is not available on Windows
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+from fastapi import FastAPI, APIRouter, Body, HTTPException, Depends, Query, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+from async_batcher.batcher import AsyncBatcher
+import redis.asyncio as redis
+from cachetools import TTLCache
 import os
 import logging
-import asyncio
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ValidationError, field_validator
+from pydantic import BaseModel, Field, EmailStr, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
+import hashlib
 from datetime import datetime, timedelta
 import jwt
 import bcrypt
+import ciso8601
 from enum import Enum
-import re
 import time
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -37,10 +52,13 @@ load_dotenv(ROOT_DIR / '.env')
 # Configuration
 class Settings:
     MONGO_URL: str = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    REDIS_URL: str = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    REDIS_TIMEOUT: float = float(os.environ.get('REDIS_TIMEOUT', '0.5'))
     DB_NAME: str = os.environ.get('DB_NAME', 'puremilk_production')
     JWT_SECRET: str = os.environ.get('JWT_SECRET', 'change-this-in-production')
     JWT_ALGORITHM: str = 'HS256'
     JWT_EXPIRY_DAYS: int = int(os.environ.get('JWT_EXPIRY_DAYS', '7'))
+    BCRYPT_ROUNDS: int = int(os.environ.get('BCRYPT_ROUNDS', '10'))
     CORS_ORIGINS: List[str] = os.environ.get('CORS_ORIGINS', '*').split(',')
     ALLOWED_HOSTS: List[str] = os.environ.get('ALLOWED_HOSTS', '*').split(',')
     RATE_LIMIT_REQUESTS: int = int(os.environ.get('RATE_LIMIT_REQUESTS', '100'))
@@ -49,72 +67,163 @@ class Settings:
     
 settings = Settings()
 
-# Rate limiting storage
-rate_limit_storage: Dict[str, List[float]] = {}
+# Sliding-window rate limiter, executed atomically inside Redis.
+# KEYS[1] = ratelimit:{ip}, ARGV = {now, window, limit, member}
+RATE_LIMIT_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) < tonumber(ARGV[3]) then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('EXPIRE', key, window)
+    return 1
+end
+return 0
+"""
+
+# Decoded JWT payloads keyed by token digest; `exp` is re-checked on every hit
+jwt_cache: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+# Customer record id by user email, for tokens issued without a `cid` claim
+customer_id_cache: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+# Revoked token IDs, kept for as long as a token can live
+revoked_jtis: TTLCache = TTLCache(maxsize=100_000, ttl=settings.JWT_EXPIRY_DAYS * 86400)
 
 # Database connection with connection pooling
 client = None
 db = None
 
+# Redis connection (rate limiting)
+redis_client = None
+rate_limit_script = None
+
+# Coalesces concurrent delivery inserts, see InsertBatcher
+delivery_batcher = None
+
+def create_mongo_client() -> AsyncMongoClient:
+    """Create the MongoDB client; the only place that knows which driver is in use"""
+    # PyMongo's native asyncio client, no thread pool between us and the socket
+    return AsyncMongoClient(
+        settings.MONGO_URL,
+        maxPoolSize=50,
+        minPoolSize=10,
+        maxIdleTimeMS=60000,
+        serverSelectionTimeoutMS=3000,
+        connectTimeoutMS=10000,
+        # Fail fast under bursts instead of queueing forever for a pooled connection
+        waitQueueTimeoutMS=2000,
+        retryWrites=True
+    )
+
+async def aggregate_list(collection, pipeline: List[Dict[str, Any]], length: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run an aggregation and collect its results; the async driver returns the cursor from a coroutine"""
+    cursor = await collection.aggregate(pipeline)
+    return await cursor.to_list(length)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global client, db
+    global client, db, redis_client, rate_limit_script, delivery_batcher
+    last_login_task = None
     try:
-        client = AsyncIOMotorClient(
-            settings.MONGO_URL,
-            maxPoolSize=50,
-            minPoolSize=10,
-            maxIdleTimeMS=30000,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=10000,
-            retryWrites=True
-        )
+        client = create_mongo_client()
         db = client[settings.DB_NAME]
         
+        # Connect and open the first pooled connections before any request arrives
+        await db.command("ping")
+        
         # Create database indexes for performance
         await create_indexes()
         logger.info("Database connected and indexes created successfully")
         
+        # Bounded timeouts so a hung Redis fails open instead of stalling every request
+        redis_client = redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_TIMEOUT
+        )
+        rate_limit_script = redis_client.register_script(RATE_LIMIT_LUA)
+        try:
+            await redis_client.script_load(RATE_LIMIT_LUA)
+            logger.info("Redis connected and rate limit script loaded")
+        except redis.RedisError as e:
+            # Not fatal: the script is loaded on first use (NOSCRIPT) once Redis is back
+            logger.warning(f"Redis unavailable at startup: {e}")
+        
+        last_login_task = asyncio.create_task(last_login_flusher())
+        delivery_batcher = InsertBatcher("deliveries", max_batch_size=200, max_queue_time=0.05)
+        
         yield
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         raise
     finally:
         # Shutdown
+        if delivery_batcher:
+            await delivery_batcher.stop()
+        if last_login_task:
+            last_login_task.cancel()
+            await flush_last_logins()
         if client:
-            client.close()
+            await client.close()
             logger.info("Database connection closed")
+        if redis_client:
+            await redis_client.aclose()
+            logger.info("Redis connection closed")
 
 async def create_indexes():
-    """Create database indexes for optimal performance"""
-    try:
+    """Create database indexes for optimal performance, all concurrently"""
+    indexes = [
         # Users collection indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("role")
-        await db.users.create_index("is_active")
+        (db.users, "email", {"unique": True}),
+        (db.users, "id", {"unique": True}),
+        (db.users, "role", {}),
+        (db.users, "is_active", {}),
         
         # Customers collection indexes
-        await db.customers.create_index("email", unique=True)
-        await db.customers.create_index("created_by")
-        await db.customers.create_index("is_active")
-        await db.customers.create_index([("name", "text"), ("email", "text"), ("phone", "text")])
+        (db.customers, "email", {"unique": True}),
+        (db.customers, "id", {"unique": True}),
+        (db.customers, "created_by", {}),
+        (db.customers, "is_active", {}),
+        (db.customers, [("name", "text"), ("email", "text"), ("phone", "text")], {}),
         
         # Deliveries collection indexes
-        await db.deliveries.create_index("customer_id")
-        await db.deliveries.create_index("delivery_date")
-        await db.deliveries.create_index("status")
-        await db.deliveries.create_index([("customer_id", 1), ("delivery_date", -1)])
+        (db.deliveries, "id", {"unique": True}),
+        (db.deliveries, "customer_id", {}),
+        (db.deliveries, "delivery_date", {}),
+        (db.deliveries, "status", {}),
+        (db.deliveries, [("customer_id", 1), ("delivery_date", -1)], {}),
+        (db.deliveries, [("status", 1), ("delivery_date", 1)], {}),
         
         # Payments collection indexes
-        await db.payments.create_index("customer_id")
-        await db.payments.create_index("payment_date")
-        await db.payments.create_index("status")
-        await db.payments.create_index([("customer_id", 1), ("payment_date", -1)])
-        
+        (db.payments, "customer_id", {}),
+        (db.payments, "payment_date", {}),
+        (db.payments, "status", {}),
+        (db.payments, [("customer_id", 1), ("payment_date", -1)], {}),
+        (db.payments, [("customer_id", 1), ("created_at", -1)], {}),
+        (db.payments, [("status", 1), ("payment_date", -1)], {}),
+        (db.payments, [("customer_id", 1), ("status", 1), ("payment_date", -1)], {}),
+        # Outstanding balances only; requires MongoDB 6.0+ for $in in partial filters
+        (db.payments, [("customer_id", 1)], {
+            "name": "customer_id_unpaid",
+            "partialFilterExpression": {"status": {"$in": _UNPAID_STATUSES}}
+        }),
+    ]
+    
+    # background=True keeps pre-4.2 servers from blocking the collection during builds
+    results = await asyncio.gather(
+        *(collection.create_index(keys, background=True, **options) for collection, keys, options in indexes),
+        return_exceptions=True
+    )
+    
+    failures = 0
+    for (collection, keys, _), result in zip(indexes, results):
+        if isinstance(result, Exception):
+            failures += 1
+            logger.error(f"Failed to create index {keys} on {collection.name}: {result}")
+    
+    if not failures:
         logger.info("Database indexes created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create indexes: {e}")
 
 # Create the main app
 app = FastAPI(
@@ -122,24 +231,17 @@ app = FastAPI(
     description="Production-ready dairy management API",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if os.environ.get('ENVIRONMENT') != 'production' else None,
     redoc_url="/redoc" if os.environ.get('ENVIRONMENT') != 'production' else None
 )
 
-# Security middleware
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=settings.ALLOWED_HOSTS if settings.ALLOWED_HOSTS != ['*'] else ['*']
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["*"],
-    max_age=3600
-)
+# Security middleware (a wildcard host list would only add a no-op layer)
+if settings.ALLOWED_HOSTS != ['*']:
+    app.add_middleware(
+        TrustedHostMiddleware,
+        allowed_hosts=settings.ALLOWED_HOSTS
+    )
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -168,6 +270,19 @@ class PaymentStatus(str, Enum):
     PAID = "paid"
     OVERDUE = "overdue"
 
+# Enum values used in queries, bound once
+_ADMIN = UserRole.ADMIN.value
+_PAID = PaymentStatus.PAID.value
+_PENDING_DELIVERY = DeliveryStatus.PENDING.value
+_UNPAID_STATUSES = [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]
+
+# Length of the day windows used in date filters
+ONE_DAY = timedelta(days=1)
+
+# Password must contain at least one letter and one number. No look-arounds, so
+# pydantic-core can run it with its Rust regex engine.
+PASSWORD_PATTERN = r'(?s)[A-Za-z].*\d|\d.*[A-Za-z]'
+
 # Enhanced Models with validation
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -182,21 +297,28 @@ class User(BaseModel):
     is_active: bool = True
     failed_login_attempts: int = 0
     locked_until: Optional[datetime] = None
+    # Linked customer record, taken from the token's `cid` claim; never persisted
+    customer_id: Optional[str] = Field(default=None, exclude=True)
+
+class AuthUser(BaseModel):
+    """The part of a user that authentication and the handlers read; no password hash"""
+    id: str
+    email: EmailStr
+    role: UserRole
+    name: str
+    phone: str
+    last_login: Optional[datetime] = None
+    is_active: bool = True
+    locked_until: Optional[datetime] = None
+    # Linked customer record, taken from the token's `cid` claim; never persisted
+    customer_id: Optional[str] = Field(default=None, exclude=True)
 
 class UserCreate(BaseModel):
     email: EmailStr
-    password: str = Field(..., min_length=8, max_length=128)
+    password: str = Field(..., min_length=8, max_length=128, pattern=PASSWORD_PATTERN)
     role: UserRole
     name: str = Field(..., min_length=2, max_length=100)
     phone: str = Field(..., pattern=r'^\+?[1-9]\d{1,14}$')
-    
-    @field_validator('password')
-    def validate_password(cls, v):
-        if not re.search(r'[A-Za-z]', v):
-            raise ValueError('Password must contain at least one letter')
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one number')
-        return v
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -228,17 +350,9 @@ class CustomerCreate(BaseModel):
     rate_per_liter: float = Field(..., gt=0, le=1000)
     morning_delivery: bool = True
     evening_delivery: bool = False
-    password: str = Field(..., min_length=8, max_length=128)
+    password: str = Field(..., min_length=8, max_length=128, pattern=PASSWORD_PATTERN)
     confirm_password: str = Field(..., min_length=8, max_length=128)
     
-    @field_validator('password')
-    def validate_password(cls, v):
-        if not re.search(r'[A-Za-z]', v):
-            raise ValueError('Password must contain at least one letter')
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one number')
-        return v
-    
     def model_validate(self, values):
         if values.get('password') != values.get('confirm_password'):
             raise ValueError('Passwords do not match')
@@ -297,48 +411,86 @@ class DashboardStats(BaseModel):
     pending_payments: float
 
 # Rate limiting middleware
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/docs", "/redoc", "/openapi.json"})
+
 async def rate_limit_middleware(request: Request, call_next):
+    if request.method == "OPTIONS" or request.url.path in RATE_LIMIT_EXEMPT_PATHS:
+        return await call_next(request)
+    
     client_ip = request.client.host
     current_time = time.time()
     
-    # Clean old entries
-    if client_ip in rate_limit_storage:
-        rate_limit_storage[client_ip] = [
-            timestamp for timestamp in rate_limit_storage[client_ip]
-            if current_time - timestamp < settings.RATE_LIMIT_WINDOW
-        ]
-    else:
-        rate_limit_storage[client_ip] = []
+    # Cleanup, count and insert happen in a single atomic round trip
+    try:
+        allowed = await rate_limit_script(
+            keys=[f"ratelimit:{client_ip}"],
+            args=[current_time, settings.RATE_LIMIT_WINDOW, settings.RATE_LIMIT_REQUESTS, f"{current_time}:{uuid.uuid4().hex}"]
+        )
+    except redis.RedisError as e:
+        # Fail open so a Redis outage does not take the API down with it
+        logger.error(f"Rate limiter unavailable: {e}")
+        allowed = 1
     
-    # Check rate limit
-    if len(rate_limit_storage[client_ip]) >= settings.RATE_LIMIT_REQUESTS:
+    if not allowed:
         logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=429,
             content={"detail": "Rate limit exceeded"}
         )
     
-    # Add current request
-    rate_limit_storage[client_ip].append(current_time)
-    
     response = await call_next(request)
     return response
 
 app.middleware("http")(rate_limit_middleware)
 
+# Added last so it wraps the rate limiter: preflights are answered before
+# reaching it, and 429 responses still carry CORS headers
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["*"],
+    max_age=3600
+)
+
 # Enhanced utility functions
-def hash_password(password: str) -> str:
-    """Hash password with bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=12)).decode('utf-8')
+def _hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
 
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
+def _verify_password_sync(password: str, hashed: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     except Exception:
         return False
 
-def create_jwt_token(user_id: str, role: str) -> str:
+# bcrypt gets its own pool so a login burst can't starve the default executor
+_BCRYPT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+def _hash_rounds(hashed: str) -> int:
+    """Cost factor of a stored bcrypt hash ($2b$<rounds>$...)"""
+    return int(hashed.split("$")[2])
+
+# Cost of hashes written before BCRYPT_ROUNDS was lowered; logins rehash them to the current cost
+LEGACY_BCRYPT_ROUNDS = 12
+
+# Verified against on logins for unknown emails so they cost the same as real ones.
+# Built at the highest cost still stored until every legacy hash has been migrated.
+_DUMMY_PASSWORD_HASH = bcrypt.hashpw(
+    b"dummy_password", bcrypt.gensalt(rounds=max(settings.BCRYPT_ROUNDS, LEGACY_BCRYPT_ROUNDS))
+).decode('utf-8')
+
+async def hash_password(password: str) -> str:
+    """Hash password with bcrypt, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(_BCRYPT_POOL, _hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """Verify password against hash, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _BCRYPT_POOL, _verify_password_sync, password, hashed
+    )
+
+def create_jwt_token(user_id: str, role: str, customer_id: Optional[str] = None) -> str:
     """Create JWT token with enhanced security"""
     payload = {
         'user_id': user_id,
@@ -347,9 +499,11 @@ def create_jwt_token(user_id: str, role: str) -> str:
         'exp': datetime.utcnow() + timedelta(days=settings.JWT_EXPIRY_DAYS),
         'jti': str(uuid.uuid4())  # JWT ID for token revocation if needed
     }
+    if customer_id:
+        payload['cid'] = customer_id
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
-def verify_jwt_token(token: str) -> dict:
+def _verify_uncached(token: str) -> dict:
     """Verify JWT token with enhanced error handling"""
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
@@ -359,28 +513,161 @@ def verify_jwt_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def verify_jwt_token(token: str) -> dict:
+    """Verify JWT token, serving repeat tokens from the in-process cache"""
+    key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+    payload = jwt_cache.get(key)
+    
+    if payload is None or payload["exp"] <= time.time():
+        jwt_cache.pop(key, None)
+        payload = _verify_uncached(token)
+        jwt_cache[key] = payload
+    
+    jti = payload.get('jti')
+    if jti in revoked_jtis:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    # Checked on every request, cached or not, so a logout on another worker applies at once
+    try:
+        if await redis_client.exists(f"revoked:{jti}"):
+            revoked_jtis[jti] = True
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+    except redis.RedisError as e:
+        logger.error(f"Token revocation check unavailable: {e}")
+    
+    return payload
+
+async def revoke_jwt_token(payload: dict):
+    """Revoke a token in this worker and, through Redis, in all others"""
+    jti = payload.get('jti')
+    revoked_jtis[jti] = True
+    ttl = max(1, int(payload["exp"] - time.time()))
+    try:
+        await redis_client.set(f"revoked:{jti}", 1, ex=ttl)
+    except redis.RedisError as e:
+        logger.warning(f"Token revocation not shared with other workers: {e}")
+
+# Only what authentication and the handlers read; password hashes never leave Mongo
+AUTH_USER_FIELDS = set(AuthUser.model_fields) - {"customer_id"}
+AUTH_USER_PROJECTION = {"_id": 0, **{field: 1 for field in AUTH_USER_FIELDS}}
+
+class AuthCache:
+    """Two-tier cache (in-process, then Redis) of user documents used for authentication"""
+    
+    def __init__(self, redis_ttl: int = 60, local_ttl: int = 10, maxsize: int = 10_000):
+        self.redis_ttl = redis_ttl
+        # Kept short so that invalidations made by other workers are picked up quickly
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=local_ttl)
+    
+    async def get_user(self, user_id: str) -> Optional[AuthUser]:
+        user = self._local.get(user_id)
+        if user is not None:
+            return user
+        
+        key = f"auth:user:{user_id}"
+        try:
+            cached = await redis_client.get(key)
+        except redis.RedisError as e:
+            logger.error(f"Auth cache unavailable: {e}")
+            cached = None
+        
+        if cached is not None:
+            user = AuthUser.model_validate_json(cached)
+        else:
+            user_doc = await db.users.find_one({"id": user_id}, AUTH_USER_PROJECTION)
+            if not user_doc:
+                return None
+            # Stored documents were validated on insert
+            user = AuthUser.model_construct(**user_doc)
+            try:
+                await redis_client.set(key, user.model_dump_json(), ex=self.redis_ttl)
+            except redis.RedisError as e:
+                logger.error(f"Auth cache unavailable: {e}")
+        
+        self._local[user_id] = user
+        return user
+    
+    async def invalidate(self, user_id: str):
+        self._local.pop(user_id, None)
+        try:
+            await redis_client.delete(f"auth:user:{user_id}")
+        except redis.RedisError as e:
+            logger.error(f"Auth cache unavailable: {e}")
+
+auth_cache = AuthCache()
+
+# Pending last_login updates, flushed to Mongo in bulk by last_login_flusher
+LAST_LOGIN_FLUSH_INTERVAL = 60
+pending_last_logins: Dict[str, datetime] = {}
+
+async def flush_last_logins():
+    """Write buffered last_login timestamps in a single bulk operation"""
+    if not pending_last_logins:
+        return
+    updates = [
+        UpdateOne({"id": user_id}, {"$set": {"last_login": seen_at}})
+        for user_id, seen_at in pending_last_logins.items()
+    ]
+    pending_last_logins.clear()
+    try:
+        await db.users.bulk_write(updates, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to flush last_login updates: {e}")
+
+async def last_login_flusher():
+    while True:
+        await asyncio.sleep(LAST_LOGIN_FLUSH_INTERVAL)
+        await flush_last_logins()
+
+class InsertBatcher(AsyncBatcher[dict, Any]):
+    """Coalesces single-document inserts arriving within max_queue_time into one insert_many"""
+    
+    def __init__(self, collection_name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.collection_name = collection_name
+    
+    async def process_batch(self, batch: List[dict]) -> List[Any]:
+        try:
+            result = await db[self.collection_name].insert_many(batch, ordered=False)
+            return result.inserted_ids
+        except BulkWriteError as e:
+            # Unordered: everything but the failed documents was written
+            errors = {error["index"]: error for error in e.details["writeErrors"]}
+            return [
+                self._write_error(errors[i]) if i in errors else doc["_id"]
+                for i, doc in enumerate(batch)
+            ]
+    
+    @staticmethod
+    def _write_error(error: dict) -> WriteError:
+        error_class = DuplicateKeyError if error["code"] == 11000 else WriteError
+        return error_class(error["errmsg"], error["code"], error)
+
+async def enqueue_delivery(delivery_doc: dict):
+    """Insert a delivery document through the shared batcher"""
+    return await delivery_batcher.process(delivery_doc)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user with enhanced security checks"""
     try:
-        payload = verify_jwt_token(credentials.credentials)
-        user_doc = await db.users.find_one({"id": payload["user_id"]})
+        payload = await verify_jwt_token(credentials.credentials)
+        user = await auth_cache.get_user(payload["user_id"])
         
-        if not user_doc:
+        if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
-        user = User(**user_doc)
-        
         if not user.is_active:
             raise HTTPException(status_code=401, detail="User account is disabled")
         
         if user.locked_until and user.locked_until > datetime.utcnow():
             raise HTTPException(status_code=401, detail="User account is temporarily locked")
         
-        # Update last login
-        await db.users.update_one(
-            {"id": user.id},
-            {"$set": {"last_login": datetime.utcnow()}}
-        )
+        # The cached User is shared across requests; attach the claim to a copy
+        if user.customer_id is None and payload.get("cid"):
+            user = user.model_copy(update={"customer_id": payload["cid"]})
+        
+        # Update last login (buffered, see last_login_flusher)
+        pending_last_logins[user.id] = datetime.utcnow()
         
         return user
     except HTTPException:
@@ -389,18 +676,91 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         logger.error(f"Error in get_current_user: {e}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-async def get_admin_user(current_user: User = Depends(get_current_user)):
+async def get_admin_user(current_user: AuthUser = Depends(get_current_user)):
     """Ensure user has admin privileges"""
     if current_user.role != UserRole.ADMIN:
         logger.warning(f"Unauthorized admin access attempt by user: {current_user.email}")
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def get_customer_id(user: AuthUser) -> Optional[str]:
+    """Resolve the customer record linked to a customer user"""
+    if user.customer_id:
+        return user.customer_id
+    
+    customer_id = customer_id_cache.get(user.email)
+    if customer_id is None:
+        customer_doc = await db.customers.find_one({"email": user.email}, {"id": 1})
+        if not customer_doc:
+            return None
+        customer_id = customer_id_cache[user.email] = customer_doc["id"]
+    return customer_id
+
+# Customer documents are read far more often than they change
+CUSTOMER_CACHE_TTL = 60
+
+async def get_cached_customer(customer_id: str) -> Optional[Customer]:
+    """Cache-aside read of a customer document through Redis"""
+    key = f"customer:{customer_id}"
+    try:
+        cached = await redis_client.get(key)
+    except redis.RedisError as e:
+        logger.error(f"Customer cache unavailable: {e}")
+        cached = None
+    if cached is not None:
+        return Customer.model_validate_json(cached)
+    
+    customer_doc = await db.customers.find_one({"id": customer_id}, {"_id": 0})
+    if not customer_doc:
+        return None
+    customer = Customer.model_construct(**customer_doc)
+    try:
+        await redis_client.set(key, customer.model_dump_json(), ex=CUSTOMER_CACHE_TTL)
+    except redis.RedisError as e:
+        logger.error(f"Customer cache unavailable: {e}")
+    return customer
+
+async def invalidate_customer(customer_id: str):
+    try:
+        await redis_client.delete(f"customer:{customer_id}")
+    except redis.RedisError as e:
+        logger.error(f"Customer cache unavailable: {e}")
+
+async def find_customer_records(user: AuthUser, collection: str, sort_field: str, skip: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Page through a customer user's own records; None if the user has no customer profile"""
+    # Routes bound limit to 1..100; PyMongo's to_list() rejects a zero length
+    customer_id = user.customer_id or customer_id_cache.get(user.email)
+    if customer_id:
+        cursor = db[collection].find(
+            {"customer_id": customer_id}, {"_id": 0}
+        ).sort(sort_field, -1).skip(skip).limit(limit).batch_size(limit)
+        return await cursor.to_list(length=limit)
+    
+    # Unknown id (token predating the cid claim): resolve and fetch in one round trip
+    records_pipeline = [{"$sort": {sort_field: -1}}, {"$skip": skip}, {"$limit": limit}, {"$project": {"_id": 0}}]
+    results = await aggregate_list(db.customers, [
+        {"$match": {"email": user.email}},
+        {"$limit": 1},
+        # localField together with a sub-pipeline requires MongoDB 5.0+
+        {"$lookup": {
+            "from": collection,
+            "localField": "id",
+            "foreignField": "customer_id",
+            "pipeline": records_pipeline,
+            "as": "records"
+        }},
+        {"$project": {"id": 1, "records": 1, "_id": 0}}
+    ], 1)
+    if not results:
+        return None
+    customer_id_cache[user.email] = results[0]["id"]
+    return results[0]["records"]
+
 # Error handlers
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request: Request, exc: ValidationError):
     logger.error(f"Validation error: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"detail": "Validation failed", "errors": exc.errors()}
     )
@@ -408,7 +768,7 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
 @app.exception_handler(500)
 async def internal_server_error_handler(request: Request, exc: Exception):
     logger.error(f"Internal server error: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -418,20 +778,23 @@ async def internal_server_error_handler(request: Request, exc: Exception):
 async def check_admin_exists():
     """Check if admin user already exists"""
     try:
-        admin_count = await db.users.count_documents({"role": UserRole.ADMIN.value})
+        admin_count = await db.users.count_documents({"role": _ADMIN})
         return {"admin_exists": admin_count > 0}
     except Exception as e:
         logger.error(f"Error checking admin existence: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.get("/auth/debug-email/{email}")
-async def debug_email_status(email: str, current_user: User = Depends(get_admin_user)):
+async def debug_email_status(email: str, current_user: AuthUser = Depends(get_admin_user)):
     """Debug endpoint to check email status in database"""
     try:
-        customer_active = await db.customers.find_one({"email": email, "is_active": True})
-        customer_inactive = await db.customers.find_one({"email": email, "is_active": False})
-        user_active = await db.users.find_one({"email": email, "is_active": True})
-        user_inactive = await db.users.find_one({"email": email, "is_active": False})
+        id_only = {"id": 1, "_id": 0}
+        customer_active, customer_inactive, user_active, user_inactive = await asyncio.gather(
+            db.customers.find_one({"email": email, "is_active": True}, id_only),
+            db.customers.find_one({"email": email, "is_active": False}, id_only),
+            db.users.find_one({"email": email, "is_active": True}, id_only),
+            db.users.find_one({"email": email, "is_active": False}, id_only)
+        )
         
         return {
             "email": email,
@@ -452,7 +815,7 @@ async def register_user(user_data: UserCreate):
     try:
         # Check if any admin already exists - Only first user can be admin
         if user_data.role == UserRole.ADMIN:
-            admin_count = await db.users.count_documents({"role": UserRole.ADMIN.value})
+            admin_count = await db.users.count_documents({"role": _ADMIN})
             if admin_count > 0:
                 raise HTTPException(status_code=403, detail="Admin already exists. Only the first user can register as admin.")
         
@@ -463,7 +826,7 @@ async def register_user(user_data: UserCreate):
             raise HTTPException(status_code=400, detail="User already exists")
         
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         
         # Create user
         user = User(
@@ -474,7 +837,11 @@ async def register_user(user_data: UserCreate):
             phone=user_data.phone
         )
         
-        await db.users.insert_one(user.dict())
+        try:
+            await db.users.insert_one(user.dict())
+        except DuplicateKeyError:
+            # Lost a race with a concurrent registration for the same email
+            raise HTTPException(status_code=400, detail="User already exists")
         
         # Create JWT token
         token = create_jwt_token(user.id, user.role.value)
@@ -504,7 +871,7 @@ async def login_user(login_data: UserLogin):
         user_doc = await db.users.find_one({"email": login_data.email})
         if not user_doc:
             # Simulate password verification to prevent timing attacks
-            hash_password("dummy_password")
+            await verify_password(login_data.password, _DUMMY_PASSWORD_HASH)
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         user = User(**user_doc)
@@ -514,7 +881,7 @@ async def login_user(login_data: UserLogin):
             raise HTTPException(status_code=401, detail="Account temporarily locked")
         
         # Verify password
-        if not verify_password(login_data.password, user.password):
+        if not await verify_password(login_data.password, user.password):
             # Increment failed attempts
             failed_attempts = user.failed_login_attempts + 1
             update_data = {"failed_login_attempts": failed_attempts}
@@ -525,6 +892,8 @@ async def login_user(login_data: UserLogin):
                 logger.warning(f"Account locked due to failed attempts: {user.email}")
             
             await db.users.update_one({"id": user.id}, {"$set": update_data})
+            if "locked_until" in update_data:
+                await auth_cache.invalidate(user.id)
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         # Check if user is active
@@ -532,17 +901,24 @@ async def login_user(login_data: UserLogin):
             raise HTTPException(status_code=401, detail="Account is disabled")
         
         # Reset failed attempts on successful login
-        await db.users.update_one(
-            {"id": user.id},
-            {"$set": {
-                "failed_login_attempts": 0,
-                "locked_until": None,
-                "last_login": datetime.utcnow()
-            }}
-        )
-        
-        # Create JWT token
-        token = create_jwt_token(user.id, user.role.value)
+        login_update = {
+            "failed_login_attempts": 0,
+            "locked_until": None,
+            "last_login": datetime.utcnow()
+        }
+        # Move hashes written at another cost to BCRYPT_ROUNDS while the plaintext is at hand
+        if _hash_rounds(user.password) != settings.BCRYPT_ROUNDS:
+            login_update["password"] = await hash_password(login_data.password)
+        await db.users.update_one({"id": user.id}, {"$set": login_update})
+        
+        # Create JWT token, carrying the customer record id for customer users. Read from
+        # Mongo, not customer_id_cache: the claim outlives any per-worker cache entry
+        customer_id = None
+        if user.role == UserRole.CUSTOMER:
+            customer_doc = await db.customers.find_one({"email": user.email}, {"id": 1, "_id": 0})
+            if customer_doc:
+                customer_id = customer_id_cache[user.email] = customer_doc["id"]
+        token = create_jwt_token(user.id, user.role.value, customer_id)
         
         logger.info(f"User logged in: {user.email}")
         
@@ -561,8 +937,24 @@ async def login_user(login_data: UserLogin):
         logger.error(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
+@api_router.post("/auth/logout")
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Logout user by revoking the presented token"""
+    try:
+        payload = await verify_jwt_token(credentials.credentials)
+        await revoke_jwt_token(payload)
+        
+        logger.info(f"Token revoked for user: {payload['user_id']}")
+        
+        return {"message": "Logged out successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Logout error: {e}")
+        raise HTTPException(status_code=500, detail="Logout failed")
+
 @api_router.get("/auth/me")
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: AuthUser = Depends(get_current_user)):
     """Get current user information"""
     return {
         "id": current_user.id,
@@ -575,151 +967,90 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Dashboard Routes
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+async def get_dashboard_stats(current_user: AuthUser = Depends(get_current_user)):
     """Get dashboard statistics with role-based filtering"""
     try:
-        today = datetime.utcnow().date()
-        month_start = datetime(today.year, today.month, 1)
+        now = datetime.utcnow()
+        today_start = datetime(now.year, now.month, now.day)
+        today_end = today_start + ONE_DAY
+        month_start = today_start.replace(day=1)
         
         if current_user.role == UserRole.ADMIN:
             # Admin sees all system stats
-            total_customers = await db.customers.count_documents({})
-            active_customers = await db.customers.count_documents({"is_active": True})
-            
-            # Today's deliveries
-            today_deliveries = await db.deliveries.count_documents({
-                "delivery_date": {
-                    "$gte": datetime.combine(today, datetime.min.time()),
-                    "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                }
-            })
-            
-            pending_deliveries = await db.deliveries.count_documents({
-                "status": DeliveryStatus.PENDING.value,
-                "delivery_date": {
-                    "$gte": datetime.combine(today, datetime.min.time()),
-                    "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                }
-            })
-            
-            # Revenue calculation with aggregation pipeline for performance
-            today_revenue_pipeline = [
-                {
-                    "$match": {
-                        "payment_date": {
-                            "$gte": datetime.combine(today, datetime.min.time()),
-                            "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                        },
-                        "status": PaymentStatus.PAID.value
-                    }
-                },
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-            ]
-            
-            today_revenue_result = await db.payments.aggregate(today_revenue_pipeline).to_list(1)
-            today_revenue = today_revenue_result[0]["total"] if today_revenue_result else 0.0
-            
-            monthly_revenue_pipeline = [
-                {
-                    "$match": {
-                        "payment_date": {"$gte": month_start},
-                        "status": PaymentStatus.PAID.value
-                    }
-                },
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            scope = {}
+            customer_counts = [
+                db.customers.count_documents({}),
+                db.customers.count_documents({"is_active": True})
             ]
-            
-            monthly_revenue_result = await db.payments.aggregate(monthly_revenue_pipeline).to_list(1)
-            monthly_revenue = monthly_revenue_result[0]["total"] if monthly_revenue_result else 0.0
-            
-            pending_payments_pipeline = [
-                {
-                    "$match": {
-                        "status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]}
-                    }
-                },
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-            ]
-            
-            pending_payments_result = await db.payments.aggregate(pending_payments_pipeline).to_list(1)
-            pending_payments_amount = pending_payments_result[0]["total"] if pending_payments_result else 0.0
-            
         else:
             # Customer sees only their own stats
-            customer_doc = await db.customers.find_one({"email": current_user.email})
-            customer_id = customer_doc["id"] if customer_doc else None
-            
-            total_customers = 1 if customer_doc else 0
-            active_customers = 1 if customer_doc else 0
-            
-            if customer_id:
-                today_deliveries = await db.deliveries.count_documents({
-                    "customer_id": customer_id,
-                    "delivery_date": {
-                        "$gte": datetime.combine(today, datetime.min.time()),
-                        "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                    }
-                })
-                
-                pending_deliveries = await db.deliveries.count_documents({
-                    "customer_id": customer_id,
-                    "status": DeliveryStatus.PENDING.value,
-                    "delivery_date": {
-                        "$gte": datetime.combine(today, datetime.min.time()),
-                        "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                    }
-                })
-                
-                # Customer's payments using aggregation
-                today_revenue_pipeline = [
-                    {
-                        "$match": {
-                            "customer_id": customer_id,
-                            "payment_date": {
-                                "$gte": datetime.combine(today, datetime.min.time()),
-                                "$lt": datetime.combine(today + timedelta(days=1), datetime.min.time())
-                            },
-                            "status": PaymentStatus.PAID.value
-                        }
-                    },
-                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-                ]
-                
-                today_revenue_result = await db.payments.aggregate(today_revenue_pipeline).to_list(1)
-                today_revenue = today_revenue_result[0]["total"] if today_revenue_result else 0.0
-                
-                monthly_revenue_pipeline = [
-                    {
-                        "$match": {
-                            "customer_id": customer_id,
-                            "payment_date": {"$gte": month_start},
-                            "status": PaymentStatus.PAID.value
-                        }
-                    },
-                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-                ]
-                
-                monthly_revenue_result = await db.payments.aggregate(monthly_revenue_pipeline).to_list(1)
-                monthly_revenue = monthly_revenue_result[0]["total"] if monthly_revenue_result else 0.0
-                
-                pending_payments_pipeline = [
-                    {
-                        "$match": {
-                            "customer_id": customer_id,
-                            "status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]}
-                        }
-                    },
-                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-                ]
-                
-                pending_payments_result = await db.payments.aggregate(pending_payments_pipeline).to_list(1)
-                pending_payments_amount = pending_payments_result[0]["total"] if pending_payments_result else 0.0
-            else:
-                today_deliveries = 0
-                pending_deliveries = 0
-                today_revenue = 0.0
-                monthly_revenue = 0.0
-                pending_payments_amount = 0.0
+            customer_id = await get_customer_id(current_user)
+            if not customer_id:
+                return DashboardStats(
+                    total_customers=0,
+                    active_customers=0,
+                    today_deliveries=0,
+                    pending_deliveries=0,
+                    today_revenue=0.0,
+                    monthly_revenue=0.0,
+                    pending_payments=0.0
+                )
+            scope = {"customer_id": customer_id}
+            customer_counts = []
+        
+        today_range = {"$gte": today_start, "$lt": today_end}
+        revenue_total = {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+        
+        # All payment figures in one round trip; the leading $match keeps it index-backed.
+        # $facet sub-pipelines never use indexes, so "today" is left to the server (MongoDB 5.0+).
+        server_today = {"$dateTrunc": {"date": "$$NOW", "unit": "day"}}
+        payments_pipeline = [
+            {
+                "$match": {
+                    **scope,
+                    "$or": [
+                        {"status": _PAID, "payment_date": {"$gte": month_start}},
+                        {"status": {"$in": _UNPAID_STATUSES}}
+                    ]
+                }
+            },
+            {
+                "$facet": {
+                    "today_revenue": [
+                        {"$match": {"status": _PAID, "$expr": {"$and": [
+                            {"$gte": ["$payment_date", server_today]},
+                            {"$lt": ["$payment_date", {"$dateAdd": {"startDate": server_today, "unit": "day", "amount": 1}}]}
+                        ]}}},
+                        revenue_total
+                    ],
+                    "monthly_revenue": [
+                        {"$match": {"status": _PAID}},
+                        revenue_total
+                    ],
+                    "pending_payments": [
+                        {"$match": {"status": {"$in": _UNPAID_STATUSES}}},
+                        revenue_total
+                    ]
+                }
+            }
+        ]
+        
+        today_deliveries, pending_deliveries, payments_result, *counts = await asyncio.gather(
+            db.deliveries.count_documents({**scope, "delivery_date": today_range}),
+            db.deliveries.count_documents({
+                **scope,
+                "status": _PENDING_DELIVERY,
+                "delivery_date": today_range
+            }),
+            aggregate_list(db.payments, payments_pipeline, 1),
+            *customer_counts
+        )
+        total_customers, active_customers = counts if counts else (1, 1)
+        
+        facets = payments_result[0]
+        today_revenue = facets["today_revenue"][0]["total"] if facets["today_revenue"] else 0.0
+        monthly_revenue = facets["monthly_revenue"][0]["total"] if facets["monthly_revenue"] else 0.0
+        pending_payments_amount = facets["pending_payments"][0]["total"] if facets["pending_payments"] else 0.0
         
         return DashboardStats(
             total_customers=total_customers,
@@ -737,10 +1068,10 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
 # Customer Management Routes
 @api_router.get("/customers", response_model=List[Customer])
 async def get_customers(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = None,
-    current_user: User = Depends(get_admin_user)
+    current_user: AuthUser = Depends(get_admin_user)
 ):
     """Get customers with pagination and search"""
     try:
@@ -752,11 +1083,10 @@ async def get_customers(
         # Get total count
         total = await db.customers.count_documents(query)
         
-        # Get customers with pagination
-        cursor = db.customers.find(query).skip(skip).limit(min(limit, 100))
-        customers = await cursor.to_list(length=limit)
-        
-        result = [Customer(**customer) for customer in customers]
+        # Get customers with pagination, building models as the cursor yields them.
+        # Stored documents were validated on insert.
+        cursor = db.customers.find(query, {"_id": 0}).skip(skip).limit(limit)
+        result = [Customer.model_construct(**customer) async for customer in cursor]
         
         # Add pagination headers would be done in a real API
         logger.info(f"Retrieved {len(result)} customers (total: {total})")
@@ -767,7 +1097,7 @@ async def get_customers(
         raise HTTPException(status_code=500, detail="Failed to fetch customers")
 
 @api_router.post("/customers", response_model=Customer)
-async def create_customer(customer_data: CustomerCreate, current_user: User = Depends(get_admin_user)):
+async def create_customer(customer_data: CustomerCreate, current_user: AuthUser = Depends(get_admin_user)):
     """Create a new customer with login credentials"""
     try:
         # Validate password confirmation
@@ -775,20 +1105,10 @@ async def create_customer(customer_data: CustomerCreate, current_user: User = De
             raise HTTPException(status_code=400, detail="Passwords do not match")
         
         # Check customer limit
-        customer_count = await db.customers.count_documents({})
+        customer_count = await db.customers.estimated_document_count()
         if customer_count >= settings.MAX_CUSTOMER_LIMIT:
             raise HTTPException(status_code=400, detail="Maximum customer limit reached")
         
-        # Check if customer email already exists (simple check since we use permanent deletes)
-        existing_customer = await db.customers.find_one({"email": customer_data.email})
-        if existing_customer:
-            raise HTTPException(status_code=400, detail="Customer with this email already exists")
-        
-        # Check if user email already exists
-        existing_user = await db.users.find_one({"email": customer_data.email})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="User with this email already exists")
-        
         # Create customer record
         customer_dict = customer_data.dict()
         customer_dict.pop('password')  # Remove password from customer data
@@ -796,7 +1116,7 @@ async def create_customer(customer_data: CustomerCreate, current_user: User = De
         customer = Customer(**customer_dict, created_by=current_user.id)
         
         # Create user credentials for customer
-        hashed_password = hash_password(customer_data.password)
+        hashed_password = await hash_password(customer_data.password)
         user = User(
             email=customer_data.email,
             password=hashed_password,
@@ -805,9 +1125,24 @@ async def create_customer(customer_data: CustomerCreate, current_user: User = De
             phone=customer_data.phone
         )
         
-        # Insert both customer and user
-        await db.customers.insert_one(customer.dict())
-        await db.users.insert_one(user.dict())
+        # Insert both customer and user concurrently; duplicate emails are rejected
+        # by the unique indexes, which leaves no window between check and insert
+        customer_result, user_result = await asyncio.gather(
+            db.customers.insert_one(customer.dict()),
+            db.users.insert_one(user.dict()),
+            return_exceptions=True
+        )
+        if isinstance(customer_result, Exception) or isinstance(user_result, Exception):
+            # Roll back whichever half made it in
+            if not isinstance(customer_result, Exception):
+                await db.customers.delete_one({"id": customer.id})
+            if not isinstance(user_result, Exception):
+                await db.users.delete_one({"id": user.id})
+            if isinstance(customer_result, DuplicateKeyError):
+                raise HTTPException(status_code=400, detail="Customer with this email already exists")
+            if isinstance(user_result, DuplicateKeyError):
+                raise HTTPException(status_code=400, detail="User with this email already exists")
+            raise customer_result if isinstance(customer_result, Exception) else user_result
         
         logger.info(f"New customer and user created: {customer.email} by admin: {current_user.email}")
         
@@ -819,13 +1154,13 @@ async def create_customer(customer_data: CustomerCreate, current_user: User = De
         raise HTTPException(status_code=500, detail="Failed to create customer")
 
 @api_router.get("/customers/{customer_id}", response_model=Customer)
-async def get_customer(customer_id: str, current_user: User = Depends(get_admin_user)):
+async def get_customer(customer_id: str, current_user: AuthUser = Depends(get_admin_user)):
     """Get a specific customer"""
     try:
-        customer_doc = await db.customers.find_one({"id": customer_id})
-        if not customer_doc:
+        customer = await get_cached_customer(customer_id)
+        if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
-        return Customer(**customer_doc)
+        return customer
     except HTTPException:
         raise
     except Exception as e:
@@ -836,38 +1171,42 @@ async def get_customer(customer_id: str, current_user: User = Depends(get_admin_
 async def update_customer(
     customer_id: str,
     customer_data: CustomerUpdate,
-    current_user: User = Depends(get_admin_user)
+    current_user: AuthUser = Depends(get_admin_user)
 ):
     """Update a customer with validation"""
     try:
-        customer_doc = await db.customers.find_one({"id": customer_id})
-        if not customer_doc:
-            raise HTTPException(status_code=404, detail="Customer not found")
-        
         update_data = {k: v for k, v in customer_data.dict().items() if v is not None}
         
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
             
-            # Check email uniqueness if email is being updated
-            if "email" in update_data:
-                existing_customer = await db.customers.find_one({
-                    "email": update_data["email"],
-                    "id": {"$ne": customer_id}
-                })
-                if existing_customer:
-                    raise HTTPException(status_code=400, detail="Email already exists")
+            # Uniqueness of a new email is enforced by the unique index on customers.email
+            try:
+                # The pre-update document is returned for its old email; applying
+                # the $set locally yields exactly what was written
+                customer_doc = await db.customers.find_one_and_update(
+                    {"id": customer_id},
+                    {"$set": update_data},
+                    projection={"_id": 0},
+                    return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                raise HTTPException(status_code=400, detail="Email already exists")
+            if not customer_doc:
+                raise HTTPException(status_code=404, detail="Customer not found")
             
-            await db.customers.update_one(
-                {"id": customer_id},
-                {"$set": update_data}
-            )
-        
-        updated_customer = await db.customers.find_one({"id": customer_id})
+            if "email" in update_data:
+                customer_id_cache.pop(customer_doc["email"], None)
+            await invalidate_customer(customer_id)
+            updated_customer = {**customer_doc, **update_data}
+        else:
+            updated_customer = await db.customers.find_one({"id": customer_id}, {"_id": 0})
+            if not updated_customer:
+                raise HTTPException(status_code=404, detail="Customer not found")
         
         logger.info(f"Customer updated: {customer_id} by admin: {current_user.email}")
         
-        return Customer(**updated_customer)
+        return Customer.model_construct(**updated_customer)
     except HTTPException:
         raise
     except Exception as e:
@@ -875,32 +1214,43 @@ async def update_customer(
         raise HTTPException(status_code=500, detail="Failed to update customer")
 
 @api_router.delete("/customers/{customer_id}")
-async def delete_customer(customer_id: str, current_user: User = Depends(get_admin_user)):
+async def delete_customer(customer_id: str, current_user: AuthUser = Depends(get_admin_user)):
     """Permanently delete a customer and their user account"""
     try:
         # First get the customer to find their email
-        customer = await db.customers.find_one({"id": customer_id})
+        customer = await db.customers.find_one({"id": customer_id}, {"email": 1, "_id": 0})
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
         customer_email = customer["email"]
+        customer_id_cache.pop(customer_email, None)
         
         # Permanently delete the customer record
         result = await db.customers.delete_one({"id": customer_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Customer not found")
+        await invalidate_customer(customer_id)
+        
+        # Cascade to the user account, deliveries and payments concurrently
+        cascade = ("user", "deliveries", "payments")
+        results = await asyncio.gather(
+            db.users.find_one_and_delete({"email": customer_email}, projection={"id": 1}),
+            db.deliveries.delete_many({"customer_id": customer_id}),
+            db.payments.delete_many({"customer_id": customer_id}),
+            return_exceptions=True
+        )
+        failed = [(name, result) for name, result in zip(cascade, results) if isinstance(result, Exception)]
+        for name, error in failed:
+            logger.error(f"Cascade delete of {name} failed for customer {customer_id}: {error}")
         
-        # Also permanently delete the associated user account
-        user_result = await db.users.delete_one({"email": customer_email})
-        
-        # Also delete any related delivery records for this customer
-        delivery_result = await db.deliveries.delete_many({"customer_id": customer_id})
-        
-        # Also delete any related payment records for this customer
-        payment_result = await db.payments.delete_many({"customer_id": customer_id})
+        user_doc, delivery_result, payment_result = results
+        if user_doc and not isinstance(user_doc, Exception):
+            await auth_cache.invalidate(user_doc["id"])
+        if failed:
+            raise HTTPException(status_code=500, detail="Failed to delete customer")
         
         logger.info(f"Customer permanently deleted: {customer_id} ({customer_email}) by admin: {current_user.email}")
-        logger.info(f"Associated records deleted - User: {user_result.deleted_count}, Deliveries: {delivery_result.deleted_count}, Payments: {payment_result.deleted_count}")
+        logger.info(f"Associated records deleted - User: {int(bool(user_doc))}, Deliveries: {delivery_result.deleted_count}, Payments: {payment_result.deleted_count}")
         
         return {"message": "Customer permanently deleted successfully"}
     except HTTPException:
@@ -916,9 +1266,9 @@ async def get_deliveries(
     date: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get deliveries with role-based filtering and date range support"""
     try:
@@ -926,19 +1276,18 @@ async def get_deliveries(
         
         if current_user.role == UserRole.CUSTOMER:
             # Customer can only see their own deliveries
-            customer_doc = await db.customers.find_one({"email": current_user.email})
-            if customer_doc:
-                filter_query["customer_id"] = customer_doc["id"]
-            else:
+            own_customer_id = await get_customer_id(current_user)
+            if not own_customer_id:
                 return []
+            filter_query["customer_id"] = own_customer_id
         elif customer_id:
             filter_query["customer_id"] = customer_id
         
         # Handle date filtering - support both single date and date range
         if start_date and end_date:
             try:
-                start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+                start_datetime = ciso8601.parse_datetime(start_date)
+                end_datetime = ciso8601.parse_datetime(end_date)
                 filter_query["delivery_date"] = {
                     "$gte": start_datetime,
                     "$lte": end_datetime
@@ -947,18 +1296,16 @@ async def get_deliveries(
                 raise HTTPException(status_code=400, detail="Invalid date range format")
         elif date:
             try:
-                target_date = datetime.fromisoformat(date).date()
-                filter_query["delivery_date"] = {
-                    "$gte": datetime.combine(target_date, datetime.min.time()),
-                    "$lt": datetime.combine(target_date + timedelta(days=1), datetime.min.time())
-                }
+                target_date = ciso8601.parse_datetime(date)
+                day_start = datetime(target_date.year, target_date.month, target_date.day)
+                filter_query["delivery_date"] = {"$gte": day_start, "$lt": day_start + ONE_DAY}
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format")
         
-        cursor = db.deliveries.find(filter_query).sort("delivery_date", -1).skip(skip).limit(min(limit, 100))
-        deliveries = await cursor.to_list(length=limit)
-        
-        return [Delivery(**delivery) for delivery in deliveries]
+        # Stored documents already have the Delivery shape; skip re-validating them and
+        # hand them to orjson as-is rather than through jsonable_encoder
+        cursor = db.deliveries.find(filter_query, {"_id": 0}).sort("delivery_date", -1).skip(skip).limit(limit)
+        return ORJSONResponse(await cursor.to_list(length=limit))
     except HTTPException:
         raise
     except Exception as e:
@@ -966,21 +1313,20 @@ async def get_deliveries(
         raise HTTPException(status_code=500, detail="Failed to fetch deliveries")
 
 @api_router.post("/deliveries", response_model=Delivery)
-async def create_delivery(delivery_data: DeliveryCreate, current_user: User = Depends(get_admin_user)):
+async def create_delivery(delivery_data: DeliveryCreate, current_user: AuthUser = Depends(get_admin_user)):
     """Create a new delivery"""
     try:
-        # Verify customer exists
-        customer_doc = await db.customers.find_one({"id": delivery_data.customer_id})
+        # Verify customer exists; only its milk type is needed
+        customer_doc = await db.customers.find_one({"id": delivery_data.customer_id}, {"milk_type": 1, "_id": 0})
         if not customer_doc:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer = Customer(**customer_doc)
         delivery = Delivery(
             **delivery_data.dict(),
-            milk_type=customer.milk_type
+            milk_type=customer_doc["milk_type"]
         )
         
-        await db.deliveries.insert_one(delivery.dict())
+        await enqueue_delivery(delivery.dict())
         
         logger.info(f"New delivery created for customer: {delivery_data.customer_id}")
         
@@ -991,22 +1337,58 @@ async def create_delivery(delivery_data: DeliveryCreate, current_user: User = De
         logger.error(f"Create delivery error: {e}")
         raise HTTPException(status_code=500, detail="Failed to create delivery")
 
+# Upper bound on one bulk request; larger routes are split by the client
+MAX_BULK_DELIVERIES = 500
+
+@api_router.post("/deliveries/bulk", response_model=List[Delivery])
+async def create_deliveries_bulk(
+    deliveries_data: List[DeliveryCreate] = Body(..., max_length=MAX_BULK_DELIVERIES),
+    current_user: AuthUser = Depends(get_admin_user)
+):
+    """Create a whole route's deliveries in one write"""
+    try:
+        if not deliveries_data:
+            raise HTTPException(status_code=400, detail="No deliveries provided")
+        
+        # Resolve every referenced customer's milk type in a single query
+        customer_ids = list({delivery.customer_id for delivery in deliveries_data})
+        milk_types = {
+            doc["id"]: doc["milk_type"]
+            async for doc in db.customers.find({"id": {"$in": customer_ids}}, {"id": 1, "milk_type": 1, "_id": 0})
+        }
+        missing = [customer_id for customer_id in customer_ids if customer_id not in milk_types]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Customers not found: {', '.join(missing)}")
+        
+        deliveries = [
+            Delivery(**delivery_data.dict(), milk_type=milk_types[delivery_data.customer_id])
+            for delivery_data in deliveries_data
+        ]
+        await db.deliveries.insert_many([delivery.dict() for delivery in deliveries], ordered=False)
+        
+        logger.info(f"{len(deliveries)} deliveries created in bulk by admin: {current_user.email}")
+        
+        return deliveries
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk create deliveries error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create deliveries")
+
 @api_router.put("/deliveries/{delivery_id}/status")
 async def update_delivery_status(
     delivery_id: str,
     status: DeliveryStatus,
-    current_user: User = Depends(get_admin_user)
+    current_user: AuthUser = Depends(get_admin_user)
 ):
     """Update delivery status"""
     try:
-        update_data = {"status": status.value}
+        update_op = {"$set": {"status": status.value}}
         if status == DeliveryStatus.DELIVERED:
-            update_data["delivered_at"] = datetime.utcnow()
+            # Stamped with the server clock, consistent across workers
+            update_op["$currentDate"] = {"delivered_at": True}
         
-        result = await db.deliveries.update_one(
-            {"id": delivery_id},
-            {"$set": update_data}
-        )
+        result = await db.deliveries.update_one({"id": delivery_id}, update_op)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Delivery not found")
@@ -1028,7 +1410,7 @@ class DeliveryUpdate(BaseModel):
 async def update_delivery(
     delivery_id: str,
     delivery_data: DeliveryUpdate,
-    current_user: User = Depends(get_admin_user)
+    current_user: AuthUser = Depends(get_admin_user)
 ):
     """Update delivery quantity and/or status"""
     try:
@@ -1039,18 +1421,16 @@ async def update_delivery(
                 raise HTTPException(status_code=400, detail="Quantity must be between 0.1 and 50 liters")
             update_data["quantity"] = delivery_data.quantity
         
+        update_op = {"$set": update_data}
         if delivery_data.status is not None:
             update_data["status"] = delivery_data.status.value
             if delivery_data.status == DeliveryStatus.DELIVERED:
-                update_data["delivered_at"] = datetime.utcnow()
+                update_op["$currentDate"] = {"delivered_at": True}
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No valid fields to update")
         
-        result = await db.deliveries.update_one(
-            {"id": delivery_id},
-            {"$set": update_data}
-        )
+        result = await db.deliveries.update_one({"id": delivery_id}, update_op)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Delivery not found")
@@ -1068,9 +1448,9 @@ async def update_delivery(
 @api_router.get("/payments")
 async def get_payments(
     customer_id: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get payments with role-based filtering"""
     try:
@@ -1078,18 +1458,17 @@ async def get_payments(
         
         if current_user.role == UserRole.CUSTOMER:
             # Customer can only see their own payments
-            customer_doc = await db.customers.find_one({"email": current_user.email})
-            if customer_doc:
-                filter_query["customer_id"] = customer_doc["id"]
-            else:
+            own_customer_id = await get_customer_id(current_user)
+            if not own_customer_id:
                 return []
+            filter_query["customer_id"] = own_customer_id
         elif customer_id:
             filter_query["customer_id"] = customer_id
         
-        cursor = db.payments.find(filter_query).sort("created_at", -1).skip(skip).limit(min(limit, 100))
-        payments = await cursor.to_list(length=limit)
-        
-        return [Payment(**payment) for payment in payments]
+        # Stored documents already have the Payment shape; skip re-validating them and
+        # hand them to orjson as-is rather than through jsonable_encoder
+        cursor = db.payments.find(filter_query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit)
+        return ORJSONResponse(await cursor.to_list(length=limit))
     except Exception as e:
         logger.error(f"Get payments error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch payments")
@@ -1099,8 +1478,8 @@ async def get_payments(
 async def health_check():
     """Health check endpoint"""
     try:
-        # Check database connection
-        await db.users.count_documents({}, limit=1)
+        # Liveness probe without touching any collection
+        await db.command("ping")
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow(),
@@ -1112,17 +1491,18 @@ async def health_check():
 
 # Customer-specific routes (for customer dashboard)
 @api_router.get("/customer/profile", response_model=Customer)
-async def get_customer_profile(current_user: User = Depends(get_current_user)):
+async def get_customer_profile(current_user: AuthUser = Depends(get_current_user)):
     """Get customer's own profile"""
     try:
         if current_user.role != UserRole.CUSTOMER:
             raise HTTPException(status_code=403, detail="Customer access only")
         
-        customer_doc = await db.customers.find_one({"email": current_user.email})
-        if not customer_doc:
+        customer_id = await get_customer_id(current_user)
+        customer = await get_cached_customer(customer_id) if customer_id else None
+        if not customer:
             raise HTTPException(status_code=404, detail="Customer profile not found")
         
-        return Customer(**customer_doc)
+        return customer
     except HTTPException:
         raise
     except Exception as e:
@@ -1131,26 +1511,20 @@ async def get_customer_profile(current_user: User = Depends(get_current_user)):
 
 @api_router.get("/customer/deliveries")
 async def get_customer_deliveries(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get customer's own deliveries"""
     try:
         if current_user.role != UserRole.CUSTOMER:
             raise HTTPException(status_code=403, detail="Customer access only")
         
-        customer_doc = await db.customers.find_one({"email": current_user.email})
-        if not customer_doc:
+        deliveries = await find_customer_records(current_user, "deliveries", "delivery_date", skip, limit)
+        if deliveries is None:
             raise HTTPException(status_code=404, detail="Customer profile not found")
         
-        deliveries_cursor = db.deliveries.find(
-            {"customer_id": customer_doc["id"]}
-        ).sort("delivery_date", -1).skip(skip).limit(limit)
-        
-        deliveries = await deliveries_cursor.to_list(length=None)
-        
-        return {"deliveries": deliveries, "count": len(deliveries)}
+        return ORJSONResponse({"deliveries": deliveries, "count": len(deliveries)})
     except HTTPException:
         raise
     except Exception as e:
@@ -1159,26 +1533,20 @@ async def get_customer_deliveries(
 
 @api_router.get("/customer/payments")
 async def get_customer_payments(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get customer's own payments"""
     try:
         if current_user.role != UserRole.CUSTOMER:
             raise HTTPException(status_code=403, detail="Customer access only")
         
-        customer_doc = await db.customers.find_one({"email": current_user.email})
-        if not customer_doc:
+        payments = await find_customer_records(current_user, "payments", "payment_date", skip, limit)
+        if payments is None:
             raise HTTPException(status_code=404, detail="Customer profile not found")
         
-        payments_cursor = db.payments.find(
-            {"customer_id": customer_doc["id"]}
-        ).sort("payment_date", -1).skip(skip).limit(limit)
-        
-        payments = await payments_cursor.to_list(length=None)
-        
-        return {"payments": payments, "count": len(payments)}
+        return ORJSONResponse({"payments": payments, "count": len(payments)})
     except HTTPException:
         raise
     except Exception as e:
@@ -1190,10 +1558,17 @@ app.include_router(api_router)
 
 if __name__ == "__main__":
     import uvicorn
+    # Same switch as the docs URLs: anything but production is a dev run with auto-reload,
+    # which uvicorn cannot combine with multiple workers
+    is_production = os.environ.get('ENVIRONMENT') == 'production'
     uvicorn.run(
         "server:app",
         host="0.0.0.0",   # keep this
         port=8001,
-        reload=True,      # change from False to True
+        reload=not is_production,
+        workers=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count())) if is_production else None,
+        loop="uvloop" if uvloop else "asyncio",
+        http="httptools",
+        timeout_keep_alive=30,
         log_level="info"
     )
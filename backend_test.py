@@ -4,25 +4,79 @@ Backend API Testing for PureMilk Dairy Management System
 Tests authentication, customer management, dashboard stats, deliveries, and payments
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 import os
-from datetime import datetime, timedelta
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
 from typing import Dict, Any, Optional
 
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it the client stays on HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Load environment variables
-BACKEND_URL = " http://0.0.0.0:8001/api"
+BACKEND_URL = "http://127.0.0.1:8001/api"
+
+# Median latency allowed for /auth/me once the server has seen a token
+WARM_AUTH_THRESHOLD_MS = float(os.environ.get("WARM_AUTH_THRESHOLD_MS", "50"))
+# Every sample counts against the server's per-client rate limit (100 requests an hour)
+WARM_AUTH_SAMPLES = int(os.environ.get("WARM_AUTH_SAMPLES", "5"))
+
+# Role-filtered listings probed the same way: (section title, noun, endpoint)
+_READ_PROBES = (
+    ("Delivery", "deliveries", "/deliveries"),
+    ("Payment", "payments", "/payments"),
+)
+
+# Fields every /dashboard/stats response must carry
+_REQUIRED_STATS_FIELDS = frozenset({
+    "total_customers", "active_customers", "today_deliveries",
+    "pending_deliveries", "today_revenue", "monthly_revenue", "pending_payments"
+})
 
+def _make_client() -> httpx.AsyncClient:
+    """One pooled keep-alive client for the whole run; independent probes share it concurrently"""
+    # HTTP/2 is negotiated via TLS ALPN, so plain-http or HTTP/1.1-only servers transparently keep HTTP/1.1
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        # Bounded connect and read so a hung server fails the run instead of stalling it
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        headers={"Content-Type": "application/json"}
+    )
+
+@dataclass(slots=True)
 class PureMilkAPITester:
-    def __init__(self):
-        self.base_url = BACKEND_URL
-        self.admin_token = None
-        self.customer_token = None
-        self.admin_user_id = None
-        self.customer_user_id = None
-        self.test_customer_id = None
-        self.test_results = []
-        
+    base_url: str = BACKEND_URL
+    admin_token: Optional[str] = None
+    customer_token: Optional[str] = None
+    admin_user_id: Optional[str] = None
+    customer_user_id: Optional[str] = None
+    test_customer_id: Optional[str] = None
+    test_results: list = field(default_factory=list)
+    # Failure details are kept on the results either way; printing them is opt-out
+    verbose: bool = field(default_factory=lambda: os.environ.get("PUREMILK_TEST_VERBOSE", "1") == "1")
+    client: httpx.AsyncClient = field(default_factory=_make_client, repr=False)
+    
+    # Full URL per endpoint path, built on first use
+    _url_cache: Dict[str, str] = field(default_factory=dict, repr=False)
+    # Encoded request bodies by payload identity; the payload is kept alongside so its id can't be reused
+    _json_cache: Dict[int, tuple] = field(default_factory=dict, repr=False)
+    # Result lines, written out once per test group; QUIET suppresses them
+    _log_buf: list = field(default_factory=list, repr=False)
+    _quiet: bool = field(default_factory=lambda: bool(os.environ.get("QUIET")), repr=False)
+    # Authorization headers built once per token; Content-Type comes from the client defaults
+    _headers_cache: Dict[Optional[str], Optional[Dict[str, str]]] = field(
+        default_factory=lambda: {None: None}, repr=False
+    )
+    
     def log_test(self, test_name: str, success: bool, message: str, details: Any = None):
         """Log test results"""
         result = {
@@ -30,55 +84,85 @@ class PureMilkAPITester:
             "success": success,
             "message": message,
             "details": details,
-            "timestamp": datetime.now().isoformat()
+            # Epoch seconds; cheaper than formatting an ISO string for every result
+            "timestamp": time.time()
         }
         self.test_results.append(result)
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name} - {message}")
-        if details and not success:
-            print(f"   Details: {details}")
+        self._log_buf.append(f"{status}: {test_name} - {message}\n")
+        if details and not success and self.verbose:
+            self._log_buf.append(f"   Details: {details}\n")
     
-    def make_request(self, method: str, endpoint: str, data: Dict = None, token: str = None) -> Dict:
-        """Make HTTP request with optional authentication"""
-        url = f"{self.base_url}{endpoint}"
-        headers = {"Content-Type": "application/json"}
-        
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
+    def _flush_log(self):
+        """Write buffered result lines in a single call"""
+        if not self._quiet:
+            sys.stdout.write("".join(self._log_buf))
+        self._log_buf.clear()
+    
+    def _assert_status(self, name: str, response: Dict, expected, ok_message: str, fail_message: str):
+        """Log a check that passes when the response status is expected (a code or a tuple of codes)"""
+        expected_codes = expected if isinstance(expected, tuple) else (expected,)
+        success = response["status_code"] in expected_codes
+        self.log_test(name, success, ok_message if success else fail_message, None if success else response["data"])
+    
+    async def make_request(self, method: str, endpoint: str, data: Dict = None, token: str = None,
+                           parse_json: bool = True) -> Dict:
+        """Make HTTP request with optional authentication; parse_json=False for status-only checks"""
+        url = self._url_cache.get(endpoint)
+        if url is None:
+            url = self._url_cache[endpoint] = f"{self.base_url}{endpoint}"
+        headers = self._headers_cache.get(token)
+        if headers is None and token:
+            headers = self._headers_cache[token] = {"Authorization": f"Bearer {token}"}
+        
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported method: {method}")
+        
+        body = None
+        if data is not None:
+            cached = self._json_cache.get(id(data))
+            if cached is None or cached[0] is not data:
+                cached = self._json_cache[id(data)] = (data, orjson.dumps(data))
+            body = cached[1]
         
         try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=headers)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=headers, json=data)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=headers, json=data)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=headers)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
+            response = await self.client.request(method, url, headers=headers, content=body)
             
             return {
                 "status_code": response.status_code,
-                "data": response.json() if response.content else {},
+                "data": (orjson.loads(response.content) if response.content else {}) if parse_json else None,
                 "success": response.status_code < 400
             }
-        except requests.exceptions.RequestException as e:
+        except httpx.TimeoutException:
+            return {
+                "status_code": 0,
+                "data": {"error": "timeout"},
+                "success": False
+            }
+        except httpx.HTTPError as e:
             return {
                 "status_code": 0,
                 "data": {"error": str(e)},
                 "success": False
             }
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {
                 "status_code": response.status_code,
                 "data": {"error": "Invalid JSON response"},
                 "success": False
             }
     
-    def test_user_registration(self):
+    def request_if(self, condition: Any, method: str, endpoint: str, data: Dict = None, token: str = None,
+                   parse_json: bool = True):
+        """Awaitable for a probe that only runs when its precondition (usually a token) holds"""
+        if condition:
+            return self.make_request(method, endpoint, data, token, parse_json)
+        return asyncio.sleep(0)
+    
+    async def test_user_registration(self):
         """Test user registration for both admin and customer roles"""
-        print("\n=== Testing User Registration ===")
+        self._log_buf.append("\n=== Testing User Registration ===\n")
         
         # Test admin registration
         admin_data = {
@@ -89,7 +173,7 @@ class PureMilkAPITester:
             "phone": "+1234567890"
         }
         
-        response = self.make_request("POST", "/auth/register", admin_data)
+        response = await self.make_request("POST", "/auth/register", admin_data)
         if response["success"] and "token" in response["data"]:
             self.admin_token = response["data"]["token"]
             self.admin_user_id = response["data"]["user"]["id"]
@@ -106,7 +190,7 @@ class PureMilkAPITester:
             "phone": "+1234567891"
         }
         
-        response = self.make_request("POST", "/auth/register", customer_data)
+        response = await self.make_request("POST", "/auth/register", customer_data)
         if response["success"] and "token" in response["data"]:
             self.customer_token = response["data"]["token"]
             self.customer_user_id = response["data"]["user"]["id"]
@@ -115,15 +199,13 @@ class PureMilkAPITester:
             self.log_test("Customer Registration", False, "Failed to register customer user", response["data"])
         
         # Test duplicate registration
-        response = self.make_request("POST", "/auth/register", admin_data)
-        if response["status_code"] == 400:
-            self.log_test("Duplicate Registration Prevention", True, "Correctly prevented duplicate registration")
-        else:
-            self.log_test("Duplicate Registration Prevention", False, "Should prevent duplicate registration", response["data"])
+        response = await self.make_request("POST", "/auth/register", admin_data, parse_json=False)
+        self._assert_status("Duplicate Registration Prevention", response, 400,
+                            "Correctly prevented duplicate registration", "Should prevent duplicate registration")
     
-    def test_user_login(self):
+    async def test_user_login(self):
         """Test user login functionality"""
-        print("\n=== Testing User Login ===")
+        self._log_buf.append("\n=== Testing User Login ===\n")
         
         # Test admin login
         admin_login = {
@@ -131,9 +213,10 @@ class PureMilkAPITester:
             "password": "AdminPass123!"
         }
         
-        response = self.make_request("POST", "/auth/login", admin_login)
+        response = await self.make_request("POST", "/auth/login", admin_login)
         if response["success"] and "token" in response["data"]:
             # Update token in case it's different
+            self._headers_cache.pop(self.admin_token, None)
             self.admin_token = response["data"]["token"]
             self.log_test("Admin Login", True, "Admin login successful")
         else:
@@ -145,8 +228,9 @@ class PureMilkAPITester:
             "password": "CustomerPass123!"
         }
         
-        response = self.make_request("POST", "/auth/login", customer_login)
+        response = await self.make_request("POST", "/auth/login", customer_login)
         if response["success"] and "token" in response["data"]:
+            self._headers_cache.pop(self.customer_token, None)
             self.customer_token = response["data"]["token"]
             self.log_test("Customer Login", True, "Customer login successful")
         else:
@@ -158,41 +242,72 @@ class PureMilkAPITester:
             "password": "WrongPassword"
         }
         
-        response = self.make_request("POST", "/auth/login", invalid_login)
-        if response["status_code"] == 401:
-            self.log_test("Invalid Credentials", True, "Correctly rejected invalid credentials")
-        else:
-            self.log_test("Invalid Credentials", False, "Should reject invalid credentials", response["data"])
+        response = await self.make_request("POST", "/auth/login", invalid_login, parse_json=False)
+        self._assert_status("Invalid Credentials", response, 401,
+                            "Correctly rejected invalid credentials", "Should reject invalid credentials")
     
-    def test_jwt_token_validation(self):
+    async def test_jwt_token_validation(self):
         """Test JWT token validation"""
-        print("\n=== Testing JWT Token Validation ===")
+        self._log_buf.append("\n=== Testing JWT Token Validation ===\n")
+        
+        # The three probes are independent, so send them together
+        valid_response, invalid_response, anonymous_response = await asyncio.gather(
+            self.request_if(self.admin_token, "GET", "/auth/me", token=self.admin_token),
+            self.make_request("GET", "/auth/me", token="invalid_token_123", parse_json=False),
+            self.make_request("GET", "/auth/me", parse_json=False)
+        )
         
         # Test valid token
         if self.admin_token:
-            response = self.make_request("GET", "/auth/me", token=self.admin_token)
+            response = valid_response
             if response["success"] and response["data"].get("role") == "admin":
                 self.log_test("Valid Token Validation", True, "Valid admin token accepted")
             else:
                 self.log_test("Valid Token Validation", False, "Valid token rejected", response["data"])
         
         # Test invalid token
-        response = self.make_request("GET", "/auth/me", token="invalid_token_123")
-        if response["status_code"] == 401:
-            self.log_test("Invalid Token Rejection", True, "Invalid token correctly rejected")
-        else:
-            self.log_test("Invalid Token Rejection", False, "Should reject invalid token", response["data"])
+        response = invalid_response
+        self._assert_status("Invalid Token Rejection", response, 401,
+                            "Invalid token correctly rejected", "Should reject invalid token")
         
         # Test no token
-        response = self.make_request("GET", "/auth/me")
-        if response["status_code"] == 403:
-            self.log_test("No Token Rejection", True, "Request without token correctly rejected")
+        response = anonymous_response
+        self._assert_status("No Token Rejection", response, 403,
+                            "Request without token correctly rejected", "Should reject request without token")
+        
+        if self.admin_token:
+            await self._probe_token_cache()
+    
+    async def _probe_token_cache(self):
+        """Time repeated /auth/me calls with one token; the server should serve them from its token cache"""
+        # Sequential on purpose: concurrent calls would measure queueing, not verification
+        samples = []
+        for _ in range(WARM_AUTH_SAMPLES + 1):
+            start = time.perf_counter()
+            response = await self.make_request("GET", "/auth/me", token=self.admin_token)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # A rejected or failed call returns fast and would pass the timing check
+            if not response["success"]:
+                self.log_test("Token Cache Latency", False,
+                              f"/auth/me returned status {response['status_code']}", response["data"])
+                return
+            samples.append(elapsed_ms)
+        cold_ms = samples.pop(0)
+        warm_ms = statistics.median(samples)
+        
+        timing = f"first {cold_ms:.1f}ms, median of {WARM_AUTH_SAMPLES} repeats {warm_ms:.1f}ms"
+        if warm_ms < WARM_AUTH_THRESHOLD_MS:
+            self.log_test("Token Cache Latency", True, timing)
         else:
-            self.log_test("No Token Rejection", False, "Should reject request without token", response["data"])
+            self.log_test(
+                "Token Cache Latency", False,
+                f"{timing}, over {WARM_AUTH_THRESHOLD_MS:.0f}ms; the server should cache verified tokens "
+                f"(keyed on the token, expiring no later than its exp) instead of re-verifying each request"
+            )
     
-    def test_customer_management_crud(self):
+    async def test_customer_management_crud(self):
         """Test customer CRUD operations"""
-        print("\n=== Testing Customer Management CRUD ===")
+        self._log_buf.append("\n=== Testing Customer Management CRUD ===\n")
         
         if not self.admin_token:
             self.log_test("Customer CRUD Setup", False, "No admin token available for testing")
@@ -211,23 +326,29 @@ class PureMilkAPITester:
             "evening_delivery": False
         }
         
-        response = self.make_request("POST", "/customers", customer_data, self.admin_token)
+        response = await self.make_request("POST", "/customers", customer_data, self.admin_token)
         if response["success"] and "id" in response["data"]:
             self.test_customer_id = response["data"]["id"]
             self.log_test("Create Customer (Admin)", True, "Customer created successfully")
         else:
             self.log_test("Create Customer (Admin)", False, "Failed to create customer", response["data"])
         
+        # Role checks and reads don't depend on each other, only on the create above
+        denied_create, admin_list, customer_list, single_customer = await asyncio.gather(
+            self.request_if(self.customer_token, "POST", "/customers", customer_data, self.customer_token),
+            self.make_request("GET", "/customers", token=self.admin_token),
+            self.request_if(self.customer_token, "GET", "/customers", token=self.customer_token),
+            self.request_if(self.test_customer_id, "GET", f"/customers/{self.test_customer_id}", token=self.admin_token)
+        )
+        
         # Test create customer with customer token (should fail)
         if self.customer_token:
-            response = self.make_request("POST", "/customers", customer_data, self.customer_token)
-            if response["status_code"] == 403:
-                self.log_test("Create Customer (Customer Role)", True, "Customer role correctly denied access")
-            else:
-                self.log_test("Create Customer (Customer Role)", False, "Should deny customer role access", response["data"])
+            response = denied_create
+            self._assert_status("Create Customer (Customer Role)", response, 403,
+                                "Customer role correctly denied access", "Should deny customer role access")
         
         # Test get all customers (admin only)
-        response = self.make_request("GET", "/customers", token=self.admin_token)
+        response = admin_list
         if response["success"] and isinstance(response["data"], list):
             self.log_test("Get All Customers (Admin)", True, f"Retrieved {len(response['data'])} customers")
         else:
@@ -235,15 +356,13 @@ class PureMilkAPITester:
         
         # Test get customers with customer token (should fail)
         if self.customer_token:
-            response = self.make_request("GET", "/customers", token=self.customer_token)
-            if response["status_code"] == 403:
-                self.log_test("Get Customers (Customer Role)", True, "Customer role correctly denied access")
-            else:
-                self.log_test("Get Customers (Customer Role)", False, "Should deny customer role access", response["data"])
+            response = customer_list
+            self._assert_status("Get Customers (Customer Role)", response, 403,
+                                "Customer role correctly denied access", "Should deny customer role access")
         
         # Test get specific customer
         if self.test_customer_id:
-            response = self.make_request("GET", f"/customers/{self.test_customer_id}", token=self.admin_token)
+            response = single_customer
             if response["success"] and response["data"].get("id") == self.test_customer_id:
                 self.log_test("Get Specific Customer", True, "Retrieved specific customer successfully")
             else:
@@ -255,7 +374,7 @@ class PureMilkAPITester:
                 "daily_quantity": 3.0,
                 "rate_per_liter": 50.0
             }
-            response = self.make_request("PUT", f"/customers/{self.test_customer_id}", update_data, self.admin_token)
+            response = await self.make_request("PUT", f"/customers/{self.test_customer_id}", update_data, self.admin_token)
             if response["success"] and response["data"].get("daily_quantity") == 3.0:
                 self.log_test("Update Customer", True, "Customer updated successfully")
             else:
@@ -263,143 +382,142 @@ class PureMilkAPITester:
         
         # Test delete customer
         if self.test_customer_id:
-            response = self.make_request("DELETE", f"/customers/{self.test_customer_id}", token=self.admin_token)
+            response = await self.make_request("DELETE", f"/customers/{self.test_customer_id}", token=self.admin_token)
             if response["success"]:
                 self.log_test("Delete Customer", True, "Customer deleted successfully")
             else:
                 self.log_test("Delete Customer", False, "Failed to delete customer", response["data"])
     
-    def test_dashboard_stats(self):
+    async def test_dashboard_stats(self):
         """Test dashboard statistics API"""
-        print("\n=== Testing Dashboard Stats API ===")
+        self._log_buf.append("\n=== Testing Dashboard Stats API ===\n")
         
         if not self.admin_token:
             self.log_test("Dashboard Stats Setup", False, "No admin token available for testing")
             return
         
+        admin_response, customer_response = await asyncio.gather(
+            self.make_request("GET", "/dashboard/stats", token=self.admin_token),
+            self.request_if(self.customer_token, "GET", "/dashboard/stats", token=self.customer_token)
+        )
+        
         # Test dashboard stats with admin token
-        response = self.make_request("GET", "/dashboard/stats", token=self.admin_token)
+        response = admin_response
         if response["success"]:
             stats = response["data"]
-            required_fields = ["total_customers", "active_customers", "today_deliveries", 
-                             "pending_deliveries", "today_revenue", "monthly_revenue", "pending_payments"]
+            missing_fields = _REQUIRED_STATS_FIELDS - stats.keys()
             
-            if all(field in stats for field in required_fields):
+            if not missing_fields:
                 self.log_test("Dashboard Stats (Admin)", True, "Dashboard stats retrieved successfully")
             else:
-                missing_fields = [field for field in required_fields if field not in stats]
-                self.log_test("Dashboard Stats (Admin)", False, f"Missing fields: {missing_fields}", stats)
+                self.log_test("Dashboard Stats (Admin)", False, f"Missing fields: {sorted(missing_fields)}", stats)
         else:
             self.log_test("Dashboard Stats (Admin)", False, "Failed to get dashboard stats", response["data"])
         
         # Test dashboard stats with customer token (should fail)
         if self.customer_token:
-            response = self.make_request("GET", "/dashboard/stats", token=self.customer_token)
-            if response["status_code"] == 403:
-                self.log_test("Dashboard Stats (Customer Role)", True, "Customer role correctly denied access")
-            else:
-                self.log_test("Dashboard Stats (Customer Role)", False, "Should deny customer role access", response["data"])
+            response = customer_response
+            self._assert_status("Dashboard Stats (Customer Role)", response, 403,
+                                "Customer role correctly denied access", "Should deny customer role access")
     
-    def test_delivery_management(self):
-        """Test delivery management endpoints"""
-        print("\n=== Testing Delivery Management ===")
-        
-        # Test get deliveries with admin token
-        if self.admin_token:
-            response = self.make_request("GET", "/deliveries", token=self.admin_token)
-            if response["success"]:
-                self.log_test("Get Deliveries (Admin)", True, f"Retrieved {len(response['data'])} deliveries")
-            else:
-                self.log_test("Get Deliveries (Admin)", False, "Failed to get deliveries", response["data"])
-        
-        # Test get deliveries with customer token
-        if self.customer_token:
-            response = self.make_request("GET", "/deliveries", token=self.customer_token)
-            if response["success"]:
-                self.log_test("Get Deliveries (Customer)", True, f"Customer can view deliveries: {len(response['data'])} deliveries")
-            else:
-                self.log_test("Get Deliveries (Customer)", False, "Customer failed to get deliveries", response["data"])
-        
-        # Test get deliveries without token (should fail)
-        response = self.make_request("GET", "/deliveries")
-        if response["status_code"] in [401, 403]:
-            self.log_test("Get Deliveries (No Auth)", True, "Correctly rejected unauthenticated request")
-        else:
-            self.log_test("Get Deliveries (No Auth)", False, "Should reject unauthenticated request", response["data"])
+    async def _probe_read_endpoint(self, endpoint: str):
+        """Admin, customer and anonymous GETs of one endpoint, sent together"""
+        return await asyncio.gather(
+            self.request_if(self.admin_token, "GET", endpoint, token=self.admin_token),
+            self.request_if(self.customer_token, "GET", endpoint, token=self.customer_token),
+            self.make_request("GET", endpoint, parse_json=False)
+        )
     
-    def test_payment_management(self):
-        """Test payment management endpoints"""
-        print("\n=== Testing Payment Management ===")
-        
-        # Test get payments with admin token
-        if self.admin_token:
-            response = self.make_request("GET", "/payments", token=self.admin_token)
-            if response["success"]:
-                self.log_test("Get Payments (Admin)", True, f"Retrieved {len(response['data'])} payments")
-            else:
-                self.log_test("Get Payments (Admin)", False, "Failed to get payments", response["data"])
-        
-        # Test get payments with customer token
-        if self.customer_token:
-            response = self.make_request("GET", "/payments", token=self.customer_token)
-            if response["success"]:
-                self.log_test("Get Payments (Customer)", True, f"Customer can view payments: {len(response['data'])} payments")
-            else:
-                self.log_test("Get Payments (Customer)", False, "Customer failed to get payments", response["data"])
-        
-        # Test get payments without token (should fail)
-        response = self.make_request("GET", "/payments")
-        if response["status_code"] in [401, 403]:
-            self.log_test("Get Payments (No Auth)", True, "Correctly rejected unauthenticated request")
-        else:
-            self.log_test("Get Payments (No Auth)", False, "Should reject unauthenticated request", response["data"])
+    async def test_read_endpoints(self):
+        """Test the role-filtered delivery and payment listings"""
+        # Both endpoints' probes go out as one batch; results are logged per endpoint afterwards
+        probe_results = await asyncio.gather(
+            *(self._probe_read_endpoint(endpoint) for _, _, endpoint in _READ_PROBES)
+        )
+        
+        for (title, noun, _), (admin_response, customer_response, anonymous_response) in zip(_READ_PROBES, probe_results):
+            label = noun.capitalize()
+            self._log_buf.append(f"\n=== Testing {title} Management ===\n")
+            
+            # Test get with admin token
+            if self.admin_token:
+                response = admin_response
+                if response["success"]:
+                    self.log_test(f"Get {label} (Admin)", True, f"Retrieved {len(response['data'])} {noun}")
+                else:
+                    self.log_test(f"Get {label} (Admin)", False, f"Failed to get {noun}", response["data"])
+            
+            # Test get with customer token
+            if self.customer_token:
+                response = customer_response
+                if response["success"]:
+                    self.log_test(f"Get {label} (Customer)", True, f"Customer can view {noun}: {len(response['data'])} {noun}")
+                else:
+                    self.log_test(f"Get {label} (Customer)", False, f"Customer failed to get {noun}", response["data"])
+            
+            # Test get without token (should fail)
+            response = anonymous_response
+            self._assert_status(f"Get {label} (No Auth)", response, (401, 403),
+                                "Correctly rejected unauthenticated request", "Should reject unauthenticated request")
     
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run all backend API tests"""
         print("🧪 Starting PureMilk Backend API Tests")
         print(f"🔗 Testing against: {self.base_url}")
         print("=" * 60)
         
-        # Run tests in order
-        self.test_user_registration()
-        self.test_user_login()
-        self.test_jwt_token_validation()
-        self.test_customer_management_crud()
-        self.test_dashboard_stats()
-        self.test_delivery_management()
-        self.test_payment_management()
+        # Run tests in order; later groups need the tokens and ids earlier ones obtain
+        try:
+            for test in (
+                self.test_user_registration,
+                self.test_user_login,
+                self.test_jwt_token_validation,
+                self.test_customer_management_crud,
+                self.test_dashboard_stats,
+                self.test_read_endpoints,
+            ):
+                await test()
+                self._flush_log()
+        finally:
+            await self.client.aclose()
         
         # Summary
         print("\n" + "=" * 60)
         print("📊 TEST SUMMARY")
         print("=" * 60)
         
-        total_tests = len(self.test_results)
-        passed_tests = sum(1 for result in self.test_results if result["success"])
+        # Count and collect failures in a single pass
+        total_tests = passed_tests = 0
+        failed_messages = []
+        for result in self.test_results:
+            total_tests += 1
+            if result["success"]:
+                passed_tests += 1
+            else:
+                failed_messages.append(f"  ❌ {result['test']}: {result['message']}")
         failed_tests = total_tests - passed_tests
+        success_rate = (passed_tests/total_tests)*100
         
         print(f"Total Tests: {total_tests}")
         print(f"✅ Passed: {passed_tests}")
         print(f"❌ Failed: {failed_tests}")
-        print(f"Success Rate: {(passed_tests/total_tests)*100:.1f}%")
+        print(f"Success Rate: {success_rate:.1f}%")
         
-        if failed_tests > 0:
+        if failed_messages:
             print("\n🔍 FAILED TESTS:")
-            for result in self.test_results:
-                if not result["success"]:
-                    print(f"  ❌ {result['test']}: {result['message']}")
+            print("\n".join(failed_messages))
         
         return {
             "total": total_tests,
             "passed": passed_tests,
             "failed": failed_tests,
-            "success_rate": (passed_tests/total_tests)*100,
+            "success_rate": success_rate,
             "results": self.test_results
         }
 
 if __name__ == "__main__":
     tester = PureMilkAPITester()
-    results = tester.run_all_tests()
+    results = asyncio.run(tester.run_all_tests())
     
     # Exit with error code if tests failed
     if results["failed"] > 0:
@@ -3,6 +3,7 @@
 Script to create an admin account for MilkWeb
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import sys
@@ -28,29 +29,49 @@ def create_admin_account():
     print(f"Role: {admin_data['role']}")
     print("=" * 50)
     
-    # Wait for server to be ready
+    # One session so the health poll and the register call share a connection
+    session = requests.Session()
+    # Single host, one request at a time; no urllib3 retries, the poll loop does its own
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    
+    # Wait for server to be ready, polling quickly at first and backing off to 0.5s
     print("⏳ Waiting for backend server to start...")
-    for i in range(30):  # Wait up to 30 seconds
+    start = time.monotonic()
+    deadline = start + 30  # Wait up to 30 seconds
+    delay = 0.05
+    last_report = 0
+    while True:
         try:
-            response = requests.get("http://localhost:8001/api/health", timeout=2)
+            response = session.get("http://localhost:8001/api/health", timeout=0.5)
             if response.status_code == 200:
                 print("✅ Backend server is running!")
                 break
         except requests.exceptions.RequestException:
-            print(f"⏳ Waiting... ({i+1}/30)")
-            time.sleep(1)
-    else:
-        print("❌ Backend server is not responding. Please start the backend first.")
-        return False
+            pass
+        
+        now = time.monotonic()
+        if now >= deadline:
+            print("❌ Backend server is not responding. Please start the backend first.")
+            return False
+        
+        # Report progress at most once per second
+        elapsed = int(now - start)
+        if elapsed > last_report:
+            last_report = elapsed
+            print(f"⏳ Waiting... ({elapsed}/30s)")
+        
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
     
     # Create admin account
     try:
         print("📝 Creating admin account...")
-        response = requests.post(
+        response = session.post(
             "http://localhost:8001/api/auth/register",
             json=admin_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
+            timeout=(3.0, 10.0)
         )
         
         if response.status_code == 200: